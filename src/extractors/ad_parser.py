@@ -120,7 +120,9 @@ def _normalize_variations(raw_variations: Any) -> List[Dict[str, Any]]:
         if not isinstance(variation, dict):
             continue
         try:
-            normalized = ensure_youtube_metadata(variation)
+            # Raw ads are only read once during parsing, so there is no need
+            # to copy each variation before normalizing it.
+            normalized = ensure_youtube_metadata(variation, copy=False)
             result.append(normalized)
         except Exception as exc:  # noqa: BLE001
             LOGGER.warning("Failed to normalize variation %r: %s", variation, exc)
@@ -145,6 +147,9 @@ def parse_advertiser_ads(
       "stats": {...},
       "variations": [...]
     }
+
+    Each variation's "youtubeMetadata" is a ``YouTubeMetadata`` object rather
+    than a dict; use ``meta["adId"]`` or ``meta.to_dict()`` to read it.
     """
     normalized: List[Dict[str, Any]] = []
 
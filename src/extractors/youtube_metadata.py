@@ -1,30 +1,222 @@
 thonfrom __future__ import annotations
 
 import logging
-from typing import Any, Dict
-from urllib.parse import parse_qs, urlparse
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+from urllib.parse import unquote_plus, urlparse
+
+try:
+    # google-re2 guarantees linear-time matching on untrusted URLs
+    import re2 as _re
+except ImportError:  # pragma: no cover - optional dependency
+    import re as _re  # type: ignore[no-redef]
 
 LOGGER = logging.getLogger("google_ad_transparency_scraper.youtube_metadata")
 
+# Matches the 11-character video ID in the common watch/embed/shorts/short-link
+# formats (including youtube-nocookie.com and encoded attribution_link URLs).
+# The trailing group requires the ID to end there, so longer values fall
+# through to the urlparse path; it is not a lookahead because RE2 has none.
+_YT_ID_RE = _re.compile(
+    r"(?:[?&](?:v|vi)=|%3[Ff]v%3[Dd]|/embed/|/shorts/|/live/|/v/|youtu\.be/)"
+    r"([A-Za-z0-9_-]{11})(?:[^A-Za-z0-9_-]|$)"
+)
+
+_YOUTUBE_HOSTS = ("youtube.com", "youtube-nocookie.com", "youtu.be")
+
+# Candidate keys, in priority order, for each youtubeMetadata field
+_META_URL_KEYS = ("youtubeUrl", "url")
+_TOP_LEVEL_URL_KEYS = ("youtubeUrl", "videoUrl", "url")
+_CTA_KEYS = ("ctaUrl", "cta")
+
+class YouTubeMetadata:
+    """
+    Compact, slotted, immutable container for a variation's YouTube metadata.
+
+    Many thousands of these are created per run, so a ``__slots__`` object is
+    used instead of a per-variation dict. Call ``to_dict`` (or let the
+    exporter do it) to get the ``{"adId", "youtubeUrl", "ctaUrl"}`` form.
+    For read access, ``meta["adId"]`` and ``dict(meta)`` also work. Note that
+    ``json.dumps`` needs ``default=lambda o: o.to_dict()`` to encode it.
+    Instances cannot be modified after creation, so they may be shared.
+    """
+
+    __slots__ = ("ad_id", "youtube_url", "cta_url")
+
+    # JSON field name -> attribute name
+    _FIELDS = {"adId": "ad_id", "youtubeUrl": "youtube_url", "ctaUrl": "cta_url"}
+
+    def __init__(self, ad_id: str, youtube_url: str, cta_url: str) -> None:
+        object.__setattr__(self, "ad_id", ad_id)
+        object.__setattr__(self, "youtube_url", youtube_url)
+        object.__setattr__(self, "cta_url", cta_url)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # Rebuild through __init__, since the default slot-state restore
+        # would go through the blocked __setattr__.
+        return (type(self), (self.ad_id, self.youtube_url, self.cta_url))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "adId": self.ad_id,
+            "youtubeUrl": self.youtube_url,
+            "ctaUrl": self.cta_url,
+        }
+
+    def keys(self) -> Tuple[str, ...]:
+        return tuple(self._FIELDS)
+
+    def __getitem__(self, key: str) -> str:
+        try:
+            return getattr(self, self._FIELDS[key])
+        except KeyError:
+            raise KeyError(key) from None
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, YouTubeMetadata):
+            return NotImplemented
+        return (self.ad_id, self.youtube_url, self.cta_url) == (
+            other.ad_id,
+            other.youtube_url,
+            other.cta_url,
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.ad_id, self.youtube_url, self.cta_url))
+
+    def __repr__(self) -> str:
+        return (
+            f"YouTubeMetadata(ad_id={self.ad_id!r}, youtube_url={self.youtube_url!r}, "
+            f"cta_url={self.cta_url!r})"
+        )
+
+# Shared instance for the common "no URL hints at all" case. YouTubeMetadata
+# is immutable, so it is safe to reuse.
+_EMPTY_METADATA = YouTubeMetadata("", "", "")
+
+def _looks_like_video_id(value: str) -> bool:
+    """
+    Cheap check for the [A-Za-z0-9_-]{11} shape of a YouTube video ID.
+    """
+    return (
+        len(value) == 11
+        and value.isascii()
+        and value.replace("-", "").replace("_", "").isalnum()
+    )
+
+def _split_host(url: str) -> tuple[str, int]:
+    """
+    Return the lower-cased host of ``url`` and the index where the rest of the
+    URL (path, query or fragment) starts, without a full ``urlparse``. Like
+    ``urlparse``, only ``scheme://host`` or ``//host`` count as a host; the
+    host is "" otherwise.
+    """
+    start = url.find("//")
+    if start < 0:
+        return "", 0
+    scheme = url[:start]
+    if scheme and not (
+        scheme.endswith(":")
+        and scheme[:1].isalpha()
+        and scheme[:-1].replace("+", "").replace("-", "").replace(".", "").isalnum()
+    ):
+        return "", 0
+
+    start += 2
+    end = len(url)
+    for sep in "/?#":
+        i = url.find(sep, start, end)
+        if i >= 0:
+            end = i
+    host = url[start:end].rpartition("@")[2].partition(":")[0].lower()
+    return host, end
+
+def _is_youtube_host(host: str) -> bool:
+    return any(host == domain or host.endswith("." + domain) for domain in _YOUTUBE_HOSTS)
+
+def _query_param_v(query: str) -> str | None:
+    """
+    Return the first non-empty ``v`` query parameter without building the
+    full dict that ``parse_qs`` would. Only that one value is decoded, the
+    same way ``parse_qs`` decodes it.
+    """
+    start = 0
+    while True:
+        i = query.find("v=", start)
+        if i < 0:
+            return None
+        if i == 0 or query[i - 1] == "&":
+            j = query.find("&", i + 2)
+            value = query[i + 2 : j if j >= 0 else None]
+            if value:
+                return unquote_plus(value)
+        start = i + 2
+
+def _looks_like_video_id_char(char: str) -> bool:
+    return char.isascii() and (char.isalnum() or char in "-_")
+
+def _first(d: Dict[str, Any], keys: tuple[str, ...]) -> Any:
+    """
+    Return the first truthy value found under ``keys`` in ``d``, or "".
+    """
+    for key in keys:
+        value = d.get(key)
+        if value:
+            return value
+    return ""
+
+@lru_cache(maxsize=4096)
 def _extract_video_id_from_url(url: str) -> str | None:
     """
     Extract a YouTube video ID from a variety of URL formats.
 
+    Results are memoized since the same creative URL is commonly reused across
+    variations and advertisers. ``url`` must therefore be hashable; callers
+    should only pass strings.
+
     Supported examples:
       - https://www.youtube.com/watch?v=VIDEO_ID
       - https://youtu.be/VIDEO_ID
+      - https://www.youtube.com/embed/VIDEO_ID
+      - https://www.youtube.com/shorts/VIDEO_ID
+      - VIDEO_ID (a bare 11-character ID)
     """
     if not url:
         return None
 
+    # Fast paths that avoid the regex entirely
+    if _looks_like_video_id(url):
+        return url
+
+    host, path_start = _split_host(url)
+    if host == "youtu.be" and url.startswith("/", path_start):
+        tail = url[path_start + 1 : path_start + 13]
+        # The ID must end after 11 characters, otherwise leave it to the slow path
+        if _looks_like_video_id(tail[:11]) and (
+            len(tail) == 11 or not _looks_like_video_id_char(tail[11])
+        ):
+            return tail[:11]
+
+    # Only YouTube hosts (youtube.com, youtu.be, youtube-nocookie.com) qualify
+    if _is_youtube_host(host):
+        match = _YT_ID_RE.search(url)
+        if match:
+            return match.group(1)
+
+    # Slow path for anything the pattern above does not recognise
     try:
         parsed = urlparse(url)
     except Exception:  # noqa: BLE001
         return None
 
     if "youtube.com" in parsed.netloc:
-        qs = parse_qs(parsed.query or "")
-        vid = qs.get("v", [None])[0]
+        vid = _query_param_v(parsed.query or "")
         if vid:
             return vid
 
@@ -41,43 +233,55 @@ def _extract_video_id_from_url(url: str) -> str | None:
 
     return None
 
-def ensure_youtube_metadata(variation: Dict[str, Any]) -> Dict[str, Any]:
+def ensure_youtube_metadata(
+    variation: Dict[str, Any],
+    *,
+    copy: bool = True,
+) -> Dict[str, Any]:
     """
-    Ensure that the given variation dict contains a 'youtubeMetadata' field with:
+    Ensure that the given variation dict contains a 'youtubeMetadata' field,
+    stored as a ``YouTubeMetadata`` object, with:
       - adId
       - youtubeUrl
       - ctaUrl (optional)
-    """
-    variation = dict(variation)  # shallow copy to avoid mutating original
 
+    Pass ``copy=False`` to update ``variation`` in place when the caller owns it.
+    """
     existing_meta = variation.get("youtubeMetadata")
+    if isinstance(existing_meta, YouTubeMetadata):
+        # Already normalized; nothing to change, so no copy is needed either
+        return variation
+
+    if copy:
+        variation = variation.copy()  # shallow copy to avoid mutating original
+
     if isinstance(existing_meta, dict):
+        ad_id = existing_meta.get("adId")
+        youtube_url = existing_meta.get("youtubeUrl")
+        cta_url = existing_meta.get("ctaUrl")
+        if ad_id and youtube_url and cta_url:
+            # Well-formed metadata: skip the fallback key scans and ID extraction
+            variation["youtubeMetadata"] = YouTubeMetadata(ad_id, youtube_url, cta_url)
+            return variation
+
         # Make sure required fields exist
-        youtube_url = existing_meta.get("youtubeUrl") or existing_meta.get("url") or ""
-        cta_url = existing_meta.get("ctaUrl") or existing_meta.get("cta") or ""
-        ad_id = existing_meta.get("adId") or _extract_video_id_from_url(youtube_url) or ""
-
-        variation["youtubeMetadata"] = {
-            "adId": ad_id,
-            "youtubeUrl": youtube_url,
-            "ctaUrl": cta_url,
-        }
+        youtube_url = _first(existing_meta, _META_URL_KEYS)
+        cta_url = _first(existing_meta, _CTA_KEYS)
+        ad_id = ad_id or (
+            isinstance(youtube_url, str) and _extract_video_id_from_url(youtube_url)
+        ) or ""
+
+        variation["youtubeMetadata"] = YouTubeMetadata(ad_id, youtube_url, cta_url)
         return variation
 
     # No youtubeMetadata present – look for URL hints at the top level
-    youtube_url = (
-        variation.get("youtubeUrl")
-        or variation.get("videoUrl")
-        or variation.get("url")
-        or ""
-    )
-    cta_url = variation.get("ctaUrl") or variation.get("cta") or ""
+    youtube_url = _first(variation, _TOP_LEVEL_URL_KEYS)
+    cta_url = _first(variation, _CTA_KEYS)
+    if not youtube_url and not cta_url:
+        variation["youtubeMetadata"] = _EMPTY_METADATA
+        return variation
 
-    ad_id = _extract_video_id_from_url(youtube_url) or ""
+    ad_id = (isinstance(youtube_url, str) and _extract_video_id_from_url(youtube_url)) or ""
 
-    variation["youtubeMetadata"] = {
-        "adId": ad_id,
-        "youtubeUrl": youtube_url,
-        "ctaUrl": cta_url,
-    }
+    variation["youtubeMetadata"] = YouTubeMetadata(ad_id, youtube_url, cta_url)
     return variation
\ No newline at end of file
@@ -1,65 +1,189 @@
 thonimport argparse
+import contextlib
+import functools
+import itertools
 import json
 import logging
+import multiprocessing
+import queue
 import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from logging.handlers import QueueHandler, QueueListener
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - optional dependency
+    ijson = None  # type: ignore[assignment]
 
 from extractors.ad_parser import parse_advertiser_ads
 from outputs.data_exporter import DataExporter
 
 LOGGER = logging.getLogger("google_ad_transparency_scraper")
 
-def configure_logging(verbosity: int) -> None:
+def _log_level(verbosity: int) -> int:
     level = logging.WARNING
     if verbosity == 1:
         level = logging.INFO
     elif verbosity >= 2:
         level = logging.DEBUG
+    return level
 
-    logging.basicConfig(
-        level=level,
-        format="%(asctime)s [%(levelname)s] %(name)s - %(message)s",
+def configure_logging(verbosity: int) -> QueueListener:
+    """
+    Route all log records through a queue that a single listener thread
+    drains to stderr, so worker threads never block on the stream handler's
+    I/O lock. The caller must stop the returned listener and remove the
+    root handler this installs.
+    """
+    handler = logging.StreamHandler()
+    handler.setFormatter(
+        logging.Formatter("%(asctime)s [%(levelname)s] %(name)s - %(message)s")
     )
 
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    root = logging.getLogger()
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(_log_level(verbosity))
+
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    return listener
+
+@contextlib.contextmanager
+def _worker_log_queue(listener: QueueListener) -> Iterator[Any]:
+    """
+    Yield a multiprocessing queue for pool worker processes, whose records are
+    forwarded to the same handlers as ``listener``.
+    """
+    log_queue: Any = multiprocessing.Queue(-1)
+    worker_listener = QueueListener(log_queue, *listener.handlers, respect_handler_level=True)
+    worker_listener.start()
+    try:
+        yield log_queue
+    finally:
+        worker_listener.stop()
+        log_queue.close()
+        log_queue.join_thread()
+
+def _configure_worker_logging(log_queue: Any, level: int) -> None:
+    """
+    Process pool initializer: send the worker's log records to the parent's queue.
+    """
+    root = logging.getLogger()
+    root.handlers[:] = [QueueHandler(log_queue)]
+    root.setLevel(level)
+
 def load_settings(settings_path: Path) -> Dict[str, Any]:
-    if not settings_path.exists():
-        raise FileNotFoundError(f"Settings file not found: {settings_path}")
+    try:
+        f = settings_path.open("r", encoding="utf-8")
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Settings file not found: {settings_path}") from None
 
-    with settings_path.open("r", encoding="utf-8") as f:
+    with f:
         settings = json.load(f)
 
     # Basic sanity defaults
     settings.setdefault("mode", "offline")
     settings.setdefault("maxPages", 0)
     settings.setdefault("concurrency", 4)
+    settings.setdefault("batchSize", 8)
     settings.setdefault("output", {}).setdefault("path", "data/output.json")
+    settings["output"].setdefault("pretty", False)
     settings.setdefault("http", {}).setdefault("timeout", 15)
     return settings
 
-def load_advertiser_definitions(advertisers_path: Path) -> List[Dict[str, Any]]:
-    if not advertisers_path.exists():
-        raise FileNotFoundError(f"Advertisers file not found: {advertisers_path}")
+_INVALID_ADVERTISERS_MESSAGE = (
+    "Invalid advertisers.sample.json format: 'advertisers' must be a list"
+)
 
-    with advertisers_path.open("r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    advertisers = data.get("advertisers")
+def _checked_advertiser_events(
+    events: Iterable[Tuple[str, str, Any]],
+) -> Iterator[Tuple[str, str, Any]]:
+    """
+    Pass ijson parse events through unchanged, raising the same error as the
+    ``json.load`` path if the top-level 'advertisers' value is missing or is
+    not a list.
+    """
+    found = False
+    for prefix, event, value in events:
+        if not found and prefix == "advertisers" and event != "map_key":
+            if event != "start_array":
+                raise ValueError(_INVALID_ADVERTISERS_MESSAGE)
+            found = True
+        yield prefix, event, value
+    if not found:
+        raise ValueError(_INVALID_ADVERTISERS_MESSAGE)
+
+def _iter_raw_advertisers(f: BinaryIO) -> Iterator[Any]:
+    if ijson is not None:
+        # Stream items one at a time instead of materializing the whole
+        # document; use_float keeps numbers as float rather than Decimal.
+        events = _checked_advertiser_events(ijson.parse(f, use_float=True))
+        yield from ijson.items(events, "advertisers.item")
+        return
+
+    data = json.load(f)
+    advertisers = data.get("advertisers") if isinstance(data, dict) else None
     if not isinstance(advertisers, list):
-        raise ValueError("Invalid advertisers.sample.json format: 'advertisers' must be a list")
-
-    valid_advertisers = []
-    for item in advertisers:
-        if not isinstance(item, dict):
-            continue
-        adv_id = item.get("advertiserId")
-        if not adv_id:
-            LOGGER.warning("Skipping advertiser entry without advertiserId: %r", item)
-            continue
-        valid_advertisers.append(item)
+        raise ValueError(_INVALID_ADVERTISERS_MESSAGE)
+    yield from advertisers
+
+def _iter_advertisers(advertisers_path: Path) -> Generator[Any, None, None]:
+    with advertisers_path.open("rb") as f:
+        # Priming point: iter_advertiser_definitions advances to here right
+        # away, so the file is open inside a started generator and close()
+        # always releases it, even if iteration never begins.
+        yield None
+
+        for item in _iter_raw_advertisers(f):
+            if not isinstance(item, dict):
+                continue
+            adv_id = item.get("advertiserId")
+            if not adv_id:
+                LOGGER.warning("Skipping advertiser entry without advertiserId: %r", item)
+                continue
+            yield item
+
+def iter_advertiser_definitions(advertisers_path: Path) -> Generator[Dict[str, Any], None, None]:
+    """
+    Lazily yield valid advertiser definitions from the advertisers JSON file.
+
+    When ``ijson`` is installed the file is parsed incrementally, so large
+    offline dumps never have to be loaded into memory in full. Its default C
+    backend (yajl2_c) rejects integers beyond 64 bits with "parse error:
+    integer overflow"; uninstall ``ijson`` to read such files with the
+    stdlib ``json`` module instead. The file is
+    opened immediately, so a missing file is reported before iteration
+    starts; call ``close()`` on the result if it may not be fully consumed.
+    """
+    advertisers = _iter_advertisers(advertisers_path)
+    try:
+        next(advertisers)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Advertisers file not found: {advertisers_path}") from None
 
-    return valid_advertisers
+    return advertisers
 
 def fetch_ads_offline_for_advertiser(
     advertiser: Dict[str, Any],
@@ -90,6 +214,14 @@ def fetch_ads_offline_for_advertiser(
     )
     return raw_ads
 
+def _fetch_options(settings: Dict[str, Any]) -> Tuple[str, int]:
+    """
+    Resolve the (mode, max_pages) pair used for fetching from settings.
+    """
+    mode = settings.get("mode", "offline").lower()
+    max_pages = int(settings.get("maxPages", 0) or 0)
+    return mode, max_pages
+
 def fetch_ads_for_advertiser(
     advertiser: Dict[str, Any],
     settings: Dict[str, Any],
@@ -98,9 +230,18 @@ def fetch_ads_for_advertiser(
     Adapter for different data sources. Right now, it primarily uses offline
     sample data, but the structure is ready for live HTTP scraping if needed.
     """
-    mode = settings.get("mode", "offline").lower()
-    max_pages = int(settings.get("maxPages", 0) or 0)
+    mode, max_pages = _fetch_options(settings)
+    return fetch_ads_for_advertiser_prepared(advertiser, mode=mode, max_pages=max_pages)
 
+def fetch_ads_for_advertiser_prepared(
+    advertiser: Dict[str, Any],
+    *,
+    mode: str,
+    max_pages: int,
+) -> List[Dict[str, Any]]:
+    """
+    Same as ``fetch_ads_for_advertiser`` but with the settings already resolved.
+    """
     if mode == "offline":
         return fetch_ads_offline_for_advertiser(advertiser, max_pages=max_pages)
 
@@ -117,13 +258,29 @@ def process_advertiser(
     advertiser: Dict[str, Any],
     settings: Dict[str, Any],
 ) -> List[Dict[str, Any]]:
+    mode, max_pages = _fetch_options(settings)
+    return process_advertiser_prepared(advertiser, mode=mode, max_pages=max_pages)
+
+def process_advertiser_prepared(
+    advertiser: Dict[str, Any],
+    *,
+    mode: str,
+    max_pages: int,
+) -> List[Dict[str, Any]]:
+    """
+    Fetch and normalize one advertiser's ads using settings resolved once per
+    run (see ``functools.partial`` usage in ``run``), so the hot per-advertiser
+    path does no settings lookups or conversions.
+    """
     advertiser_id = advertiser.get("advertiserId")
     advertiser_name = advertiser.get("advertiserName", "Unknown Advertiser")
 
     LOGGER.info("Processing advertiser %s (%s)", advertiser_name, advertiser_id)
 
     try:
-        raw_ads = fetch_ads_for_advertiser(advertiser, settings=settings)
+        raw_ads = fetch_ads_for_advertiser_prepared(
+            advertiser, mode=mode, max_pages=max_pages
+        )
         normalized_ads = parse_advertiser_ads(
             advertiser_id=advertiser_id,
             advertiser_name=advertiser_name,
@@ -145,25 +302,69 @@ def process_advertiser(
         )
         return []
 
+def _process_chunk(
+    chunk: List[Dict[str, Any]],
+    worker: Callable[[Dict[str, Any]], List[Dict[str, Any]]],
+) -> List[Dict[str, Any]]:
+    """
+    Process a batch of advertisers in a single worker round-trip and return
+    their normalized ads as one flat list.
+    """
+    results: List[Dict[str, Any]] = []
+    for advertiser in chunk:
+        results.extend(worker(advertiser))
+    return results
+
+def _write_batch_result(
+    future: Future,
+    chunk: List[Dict[str, Any]],
+    exporter: DataExporter,
+) -> None:
+    try:
+        records = future.result()
+    except Exception as exc:  # noqa: BLE001
+        LOGGER.exception(
+            "Unhandled exception processing batch of %d advertisers (%s): %s",
+            len(chunk),
+            ", ".join(str(adv.get("advertiserId")) for adv in chunk),
+            exc,
+        )
+        return
+
+    # Export errors are not a per-batch problem: let them abort the run so the
+    # exporter discards its temporary file and the previous output is kept.
+    exporter.write_records(records)
+
+def _iter_chunks(
+    items: Iterable[Dict[str, Any]],
+    size: int,
+) -> Iterator[List[Dict[str, Any]]]:
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
 def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Google Ads Transparency Scraper (offline sample implementation)."
     )
     parser.add_argument(
         "--settings",
-        type=str,
-        default="src/config/settings.example.json",
+        type=Path,
+        default=Path("src/config/settings.example.json"),
         help="Path to JSON settings file.",
     )
     parser.add_argument(
         "--advertisers",
-        type=str,
-        default="data/advertisers.sample.json",
+        type=Path,
+        default=Path("data/advertisers.sample.json"),
         help="Path to advertisers sample JSON file.",
     )
     parser.add_argument(
         "--output",
-        type=str,
+        type=Path,
         default=None,
         help="Output JSON file path (overrides settings.output.path if provided).",
     )
@@ -184,10 +385,20 @@ def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
 
 def main(argv: Optional[List[str]] = None) -> int:
     args = parse_args(argv)
-    configure_logging(args.verbose)
 
-    settings_path = Path(args.settings)
-    advertisers_path = Path(args.advertisers)
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    listener = configure_logging(args.verbose)
+    try:
+        return run(args, listener)
+    finally:
+        listener.stop()
+        root.handlers[:] = saved_handlers
+        root.setLevel(saved_level)
+
+def run(args: argparse.Namespace, listener: QueueListener) -> int:
+    settings_path: Path = args.settings
+    advertisers_path: Path = args.advertisers
 
     try:
         settings = load_settings(settings_path)
@@ -198,55 +409,91 @@ def main(argv: Optional[List[str]] = None) -> int:
     if args.max_pages is not None:
         settings["maxPages"] = args.max_pages
 
+    advertiser_count = 0
+
+    concurrency = int(settings.get("concurrency", 4) or 1)
+    batch_size = max(1, int(settings.get("batchSize", 8) or 1))
+
+    # Settings are fixed for the whole run, so resolve them once and bind
+    # them into the per-advertiser worker instead of re-reading them per call.
+    mode, max_pages = _fetch_options(settings)
+    worker = functools.partial(process_advertiser_prepared, mode=mode, max_pages=max_pages)
+    LOGGER.info(
+        "Starting scrape (concurrency=%d, batchSize=%d)", concurrency, batch_size
+    )
+
+    output_path: Path = args.output or Path(
+        settings.get("output", {}).get("path", "data/output.json")
+    )
+    exporter = DataExporter(
+        output_path=output_path,
+        pretty=bool(settings.get("output", {}).get("pretty", False)),
+    )
+
     try:
-        advertisers = load_advertiser_definitions(advertisers_path)
+        advertisers = iter_advertiser_definitions(advertisers_path)
     except Exception as exc:  # noqa: BLE001
         LOGGER.exception("Failed to load advertisers from %s: %s", advertisers_path, exc)
         return 1
 
-    if not advertisers:
-        LOGGER.error("No valid advertisers found in %s", advertisers_path)
-        return 1
-
-    all_ads: List[Dict[str, Any]] = []
-
-    concurrency = int(settings.get("concurrency", 4) or 1)
-    LOGGER.info("Starting scrape for %d advertisers (concurrency=%d)", len(advertisers), concurrency)
-
-    if concurrency <= 1 or len(advertisers) == 1:
-        # Simple sequential processing
-        for advertiser in advertisers:
-            all_ads.extend(process_advertiser(advertiser, settings=settings))
-    else:
-        with ThreadPoolExecutor(max_workers=concurrency) as executor:
-            futures = {
-                executor.submit(process_advertiser, advertiser, settings): advertiser
-                for advertiser in advertisers
-            }
-            for future in as_completed(futures):
-                adv = futures[future]
-                try:
-                    all_ads.extend(future.result())
-                except Exception as exc:  # noqa: BLE001
-                    LOGGER.exception(
-                        "Unhandled exception processing advertiser %s (%s): %s",
-                        adv.get("advertiserName", "Unknown"),
-                        adv.get("advertiserId"),
-                        exc,
-                    )
-
-    LOGGER.info("Total normalized ads collected: %d", len(all_ads))
-
-    output_path_str = args.output or settings.get("output", {}).get("path", "data/output.json")
-    exporter = DataExporter(output_path=Path(output_path_str))
-
+    # Results are streamed to the exporter as they arrive rather than being
+    # buffered, so peak memory stays bounded by the number of in-flight
+    # batches. Advertisers are parsed lazily as well, so any problem with the
+    # input file surfaces here too. The output file is only replaced if the
+    # whole run succeeds.
     try:
-        final_path = exporter.export(all_ads)
+        with exporter:
+            if concurrency <= 1:
+                # Simple sequential processing
+                for advertiser in advertisers:
+                    advertiser_count += 1
+                    exporter.write_records(worker(advertiser))
+            else:
+                with contextlib.ExitStack() as stack:
+                    executor: Executor
+                    if mode == "offline":
+                        # Offline parsing is pure-Python CPU work, so use processes to get
+                        # real parallelism instead of threads contending for the GIL.
+                        worker_log_queue = stack.enter_context(_worker_log_queue(listener))
+                        executor = ProcessPoolExecutor(
+                            max_workers=concurrency,
+                            initializer=_configure_worker_logging,
+                            initargs=(worker_log_queue, _log_level(args.verbose)),
+                        )
+                    else:
+                        executor = ThreadPoolExecutor(max_workers=concurrency)
+                    # Entered last so the pool shuts down before its log queue does
+                    stack.enter_context(executor)
+
+                    # Submit advertisers in batches so per-task dispatch and pickling
+                    # overhead is amortized. Batches are submitted as soon as they are
+                    # read, so workers start before the whole file has been parsed,
+                    # while capping how many are in flight at once.
+                    max_in_flight = concurrency * 2
+                    pending: Dict[Future, List[Dict[str, Any]]] = {}
+                    for chunk in _iter_chunks(advertisers, batch_size):
+                        advertiser_count += len(chunk)
+                        pending[executor.submit(_process_chunk, chunk, worker)] = chunk
+                        if len(pending) >= max_in_flight:
+                            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                            for future in done:
+                                _write_batch_result(future, pending.pop(future), exporter)
+
+                    for future in as_completed(list(pending)):
+                        _write_batch_result(future, pending.pop(future), exporter)
+
+            if not advertiser_count:
+                raise ValueError(f"No valid advertisers found in {advertisers_path}")
     except Exception as exc:  # noqa: BLE001
-        LOGGER.exception("Failed to export data: %s", exc)
+        LOGGER.exception("Failed to scrape advertisers from %s: %s", advertisers_path, exc)
         return 1
+    finally:
+        # Releases the input file even if iteration never started
+        advertisers.close()
 
-    LOGGER.info("Scrape completed successfully. Output written to %s", final_path)
+    LOGGER.info("Processed %d advertisers", advertiser_count)
+    LOGGER.info("Total normalized ads collected: %d", exporter.record_count)
+    LOGGER.info("Scrape completed successfully. Output written to %s", exporter.output_path)
     return 0
 
 if __name__ == "__main__":
@@ -2,53 +2,238 @@ thonfrom __future__ import annotations
 
 import json
 import logging
+import os
 from pathlib import Path
-from typing import Any, Iterable, List
+from typing import IO, Any, Callable, Iterable, List
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore[assignment]
 
 LOGGER = logging.getLogger("google_ad_transparency_scraper.data_exporter")
 
+def _default_serializer(obj: Any) -> Any:
+    try:
+        # Lightweight record types (e.g. YouTubeMetadata) expose to_dict()
+        to_dict = getattr(obj, "to_dict", None)
+        if callable(to_dict):
+            return to_dict()
+        return str(obj)
+    except Exception:  # noqa: BLE001
+        return "UNSERIALIZABLE"
+
+def _fsync(f: IO[Any]) -> None:
+    """
+    Flush Python and OS buffers so the data is on disk before it is renamed
+    into place.
+    """
+    f.flush()
+    os.fsync(f.fileno())
+
+def _fsync_dir(path: Path) -> None:
+    """
+    fsync a directory so a rename inside it survives a crash. Directories
+    cannot be opened this way on Windows, where this is a no-op.
+    """
+    if os.name != "posix":
+        return
+    fd = os.open(os.fspath(path), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
 class DataExporter:
     """
     Responsible for exporting normalized ad data into a JSON file on disk.
     """
 
-    def __init__(self, output_path: Path) -> None:
+    def __init__(self, output_path: Path, pretty: bool = False) -> None:
         self.output_path = output_path
+        self.pretty = pretty
+
+    def _json_options(self, pretty: bool) -> dict[str, Any]:
+        # Without an indent the stdlib json module can use its C encoder, and
+        # compact separators keep the output smaller. Both are still valid JSON.
+        options: dict[str, Any] = {
+            "ensure_ascii": False,
+            "default": _default_serializer,
+        }
+        if pretty:
+            options["indent"] = 2
+        else:
+            options["separators"] = (",", ":")
+        return options
+
+    def _record_encoder(self, pretty: bool) -> Callable[[Any], bytes]:
+        """
+        Return a function that encodes a single record to UTF-8 JSON bytes,
+        using ``orjson`` when installed and the stdlib ``json`` otherwise.
+        Records orjson rejects (e.g. integers beyond 64 bits) are re-encoded
+        with the stdlib ``json``.
+        """
+        options = self._json_options(pretty)
+
+        def encode_stdlib(record: Any) -> bytes:
+            return json.dumps(record, **options).encode("utf-8")
+
+        if orjson is None:
+            return encode_stdlib
+
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+
+        def encode(record: Any) -> bytes:
+            try:
+                return orjson.dumps(record, default=_default_serializer, option=option)
+            except TypeError:  # includes orjson.JSONEncodeError
+                return encode_stdlib(record)
+
+        return encode
+
+    def _prepare_tmp_path(self) -> Path:
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        return self.output_path.with_suffix(self.output_path.suffix + ".tmp")
 
     def export(self, records: Iterable[dict[str, Any]]) -> Path:
         """
         Write all records to the configured JSON file.
 
-        The file is created with pretty-printing and UTF-8 encoding. Any
-        non-serializable values are converted into strings.
+        The file is written compactly in UTF-8, or indented when the exporter
+        was created with ``pretty=True``. Any non-serializable values are
+        converted into strings. ``orjson`` is used for encoding when installed,
+        falling back to the stdlib ``json``.
         """
         records_list: List[dict[str, Any]] = list(records)
-        output_dir = self.output_path.parent
-        output_dir.mkdir(parents=True, exist_ok=True)
-
-        tmp_path = self.output_path.with_suffix(self.output_path.suffix + ".tmp")
+        tmp_path = self._prepare_tmp_path()
 
         LOGGER.debug(
             "Writing %d records to temporary file %s", len(records_list), tmp_path
         )
 
-        def default_serializer(obj: Any) -> Any:
+        encoded: bytes | None = None
+        if orjson is not None:
+            option = orjson.OPT_NON_STR_KEYS
+            if self.pretty:
+                option |= orjson.OPT_INDENT_2
             try:
-                return str(obj)
-            except Exception:  # noqa: BLE001
-                return "UNSERIALIZABLE"
-
-        with tmp_path.open("w", encoding="utf-8") as f:
-            json.dump(
-                records_list,
-                f,
-                ensure_ascii=False,
-                indent=2,
-                default=default_serializer,
-            )
+                encoded = orjson.dumps(
+                    records_list,
+                    default=_default_serializer,
+                    option=option,
+                )
+            except TypeError:  # includes orjson.JSONEncodeError
+                # e.g. integers beyond 64 bits; the stdlib path handles them
+                LOGGER.debug("orjson could not encode records; using stdlib json")
+
+        if encoded is not None:
+            with open(os.fspath(tmp_path), "wb") as f:
+                f.write(encoded)
+                _fsync(f)
+        else:
+            with open(os.fspath(tmp_path), "w", encoding="utf-8") as f:
+                json.dump(records_list, f, **self._json_options(self.pretty))
+                _fsync(f)
 
         # Replace any previous file atomically
-        tmp_path.replace(self.output_path)
+        os.replace(os.fspath(tmp_path), os.fspath(self.output_path))
+        _fsync_dir(self.output_path.parent)
 
         LOGGER.info("Exported %d records to %s", len(records_list), self.output_path)
+        return self.output_path
+
+    def __enter__(self) -> "DataExporter":
+        """
+        Open a temporary file for incremental writes via ``write_records``.
+
+        If the output path ends in ``.ndjson`` each record is written on its
+        own line; otherwise the records are framed as a single JSON array. On
+        a clean exit the temporary file atomically replaces the output file;
+        if an exception escapes the block it is discarded instead.
+        """
+        self._tmp_path = self._prepare_tmp_path()
+        self._ndjson = self.output_path.suffix.lower() == ".ndjson"
+        self._count = 0
+        # NDJSON needs exactly one record per line, so never indent it
+        pretty = self.pretty and not self._ndjson
+        self._encode = self._record_encoder(pretty)
+        if pretty:
+            encode_record = self._encode
+
+            def encode_nested(record: Any) -> bytes:
+                # Nest each record one level inside the array, as indent=2 on
+                # the whole list would. Encoded JSON never contains raw
+                # newlines inside strings, so this only touches layout.
+                return b"  " + encode_record(record).replace(b"\n", b"\n  ")
+
+            self._encode = encode_nested
+
+        LOGGER.debug("Streaming records to temporary file %s", self._tmp_path)
+
+        self._file = open(os.fspath(self._tmp_path), "wb")
+        if not self._ndjson:
+            self._file.write(b"[\n")
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        f = self._file
+        try:
+            if exc_type is None:
+                if not self._ndjson:
+                    f.write(b"\n]" if self._count else b"]")
+                _fsync(f)
+        finally:
+            f.close()
+
+        if exc_type is not None:
+            self._tmp_path.unlink(missing_ok=True)
+            return
+
+        # Replace any previous file atomically
+        os.replace(os.fspath(self._tmp_path), os.fspath(self.output_path))
+        _fsync_dir(self.output_path.parent)
+
+        LOGGER.info("Exported %d records to %s", self._count, self.output_path)
+
+    @property
+    def record_count(self) -> int:
+        """
+        Number of records written so far by ``write_records``.
+        """
+        return self._count
+
+    def write_records(self, records: Iterable[dict[str, Any]]) -> None:
+        """
+        Append records to the open output file.
+
+        All records in the call are encoded before anything is written, so an
+        encoding error leaves the file exactly as it was rather than holding
+        part of the batch.
+        """
+        encode = self._encode
+        count = self._count
+        chunks: List[bytes] = []
+        for record in records:
+            if self._ndjson:
+                chunks.append(encode(record))
+                chunks.append(b"\n")
+            else:
+                if count:
+                    chunks.append(b",\n")
+                chunks.append(encode(record))
+            count += 1
+
+        self._file.write(b"".join(chunks))
+        self._count = count
+
+    def export_stream(self, records: Iterable[dict[str, Any]]) -> Path:
+        """
+        Write records to the configured file one at a time, without building
+        an intermediate list, so memory use stays flat regardless of size.
+        """
+        with self:
+            for record in records:
+                self.write_records((record,))
         return self.output_path
\ No newline at end of file